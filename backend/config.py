@@ -25,5 +25,35 @@ UPLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB max file size
 FILE_EXPIRY = timedelta(hours=24)  # Files older than this will be deleted
 
+# Model Cache Configuration
+MODEL_CACHE_SIZE = 4  # Maximum number of parsed IFC models kept in memory
+
+# Session Configuration
+MAX_SESSIONS = 100  # Maximum number of conversation sessions kept in memory
+SESSION_IDLE_TIMEOUT = timedelta(minutes=30)  # Sessions idle longer than this are dropped
+SESSION_MEMORY_LIMIT = 64 * 1024 * 1024  # 64MB approximate cap on a session's variables
+SESSION_PROMPT_TURNS = 5  # Number of recent turns included in the prompt
+
+# Result Configuration
+RESULT_PAGE_SIZE = 500  # Default number of rows per result page
+MAX_RESULT_PAGE_SIZE = 5000  # Largest page a client may request
+MAX_RESULT_ROWS = 200000  # Rows beyond this are dropped and the result marked truncated
+MAX_STORED_RESULTS = 50  # Maximum number of results kept for paging and export
+RESULT_EXPIRY = timedelta(hours=1)  # Stored results older than this are dropped
+RESULT_PREVIEW_ROWS = 20  # Rows rendered into the plain-text response
+
+# Admission Control Configuration
+MAX_CONCURRENT_QUERIES = 4  # Queries processed at the same time across all files
+MAX_CONCURRENT_QUERIES_PER_FILE = 2  # Queries processed at the same time on one file
+MAX_QUEUED_QUERIES = 32  # Queries waiting for a slot before new ones are rejected
+QUERY_QUEUE_TIMEOUT = 120  # Seconds a query may wait for a slot
+QUERY_PRIORITIES = {"interactive": 0, "batch": 1}  # Lower value is served first
+INITIAL_QUERY_DURATION = 20.0  # Seconds assumed per query before any have completed
+
+# Startup Configuration
+WARMUP_MAX_FILES = MODEL_CACHE_SIZE  # Most recently uploaded files parsed and indexed at startup
+WARMUP_RETRY_DELAY = 1  # Seconds before the first retry of a failed model initialization
+WARMUP_MAX_RETRY_DELAY = 60  # Longest delay between model initialization retries
+
 # Create uploads directory if it doesn't exist
 os.makedirs(UPLOAD_DIR, exist_ok=True) 
\ No newline at end of file
@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -7,13 +9,22 @@ from config import (
     CORS_ORIGINS, CORS_CREDENTIALS, CORS_METHODS, CORS_HEADERS
 )
 from routes import upload_routes, query_routes, health_routes
+from services.warmup_service import warmup_service
 from utils.error_handling import AppException, handle_app_exception, handle_http_exception, handle_generic_exception
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up in the background so the worker starts serving liveness checks at once"""
+    warmup_task = asyncio.create_task(warmup_service.warm_up())
+    yield
+    warmup_task.cancel()
+
 # Initialize FastAPI app
 app = FastAPI(
     title=API_TITLE,
     description=API_DESCRIPTION,
-    version=API_VERSION
+    version=API_VERSION,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional
 import os
 from config import UPLOAD_DIR, FILE_EXPIRY
 
@@ -8,15 +8,38 @@ class FileStorage:
     
     def __init__(self):
         self.files: Dict[str, dict] = {}
+        self.revisions: Dict[str, List[dict]] = {}  # Earlier revisions per file, oldest first
+        self.delete_hooks: List[Callable[[str], None]] = []
     
     def add_file(self, filename: str, file_path: str, file_size: int) -> dict:
-        """Add a file to the storage"""
+        """Add a file to the storage, replacing any earlier upload and its revisions"""
+        self._remove_revision_files(filename, keep=file_path)
+        
+        file_info = {
+            "filename": filename,
+            "file_path": file_path,
+            "upload_time": datetime.now().isoformat(),
+            "file_size": file_size,
+            "revision": 1
+        }
+        self.files[filename] = file_info
+        self.revisions[filename] = []
+        return file_info
+    
+    def add_revision(self, filename: str, file_path: str, file_size: int) -> Optional[dict]:
+        """Add a new revision of an existing file, keeping the previous one in its history"""
+        current = self.files.get(filename)
+        if current is None:
+            return None
+        
         file_info = {
             "filename": filename,
             "file_path": file_path,
             "upload_time": datetime.now().isoformat(),
-            "file_size": file_size
+            "file_size": file_size,
+            "revision": current["revision"] + 1
         }
+        self.revisions.setdefault(filename, []).append(current)
         self.files[filename] = file_info
         return file_info
     
@@ -24,20 +47,48 @@ class FileStorage:
         """Get file information by filename"""
         return self.files.get(filename)
     
+    def get_revision(self, filename: str, revision: int) -> Optional[dict]:
+        """Get file information for a specific revision of a file"""
+        for file_info in self.list_revisions(filename):
+            if file_info["revision"] == revision:
+                return file_info
+        return None
+    
+    def list_revisions(self, filename: str) -> list:
+        """List all revisions of a file, oldest first"""
+        if filename not in self.files:
+            return []
+        return self.revisions.get(filename, []) + [self.files[filename]]
+    
+    def register_delete_hook(self, hook: Callable[[str], None]):
+        """Register a callback invoked with the path of every deleted file"""
+        self.delete_hooks.append(hook)
+    
     def delete_file(self, filename: str) -> bool:
-        """Delete a file from storage"""
+        """Delete a file and all of its revisions from storage"""
         if filename in self.files:
-            file_info = self.files[filename]
+            self._remove_revision_files(filename)
+            
+            # Remove from tracking
+            del self.files[filename]
+            self.revisions.pop(filename, None)
+            return True
+        return False
+    
+    def _remove_revision_files(self, filename: str, keep: Optional[str] = None):
+        """Remove every revision of a file from disk and drop anything cached for it"""
+        for file_info in self.list_revisions(filename):
             file_path = file_info["file_path"]
+            if file_path == keep:
+                continue
             
             # Remove the file from disk if it exists
             if os.path.exists(file_path):
                 os.remove(file_path)
             
-            # Remove from tracking
-            del self.files[filename]
-            return True
-        return False
+            # Drop anything cached for this path
+            for hook in self.delete_hooks:
+                hook(file_path)
     
     def list_files(self) -> list:
         """List all files in storage"""
@@ -1,11 +1,36 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Literal, Optional, List
 from datetime import datetime
 
 class Query(BaseModel):
     """Schema for query requests"""
     message: str
     file_path: Optional[str] = None
+    session_id: Optional[str] = None
+    priority: Literal["interactive", "batch"] = "interactive"
+    ticket_id: Optional[str] = None
+
+class ResultColumn(BaseModel):
+    """Schema for a column of a structured result"""
+    name: str
+    type: str
+
+class ResultPage(BaseModel):
+    """Schema for a page of a structured query result"""
+    result_id: str
+    kind: str
+    columns: List[ResultColumn]
+    rows: List[List[Any]]
+    total_rows: int
+    offset: int
+    next_cursor: Optional[str] = None
+    truncated: bool = False
+
+class QueryResponse(BaseModel):
+    """Schema for query responses"""
+    response: str
+    session_id: str
+    result: ResultPage
 
 class FileInfo(BaseModel):
     """Schema for file information"""
@@ -13,15 +38,46 @@ class FileInfo(BaseModel):
     file_path: str
     upload_time: str
     file_size: int
+    revision: int = 1
 
 class FileList(BaseModel):
     """Schema for file list response"""
     files: List[FileInfo]
 
+class ChangeSummary(BaseModel):
+    """Schema for entity-level change counts between two revisions"""
+    added: int
+    removed: int
+    modified: int
+    unchanged: int
+
+class RevisionInfo(FileInfo):
+    """Schema for a newly uploaded revision"""
+    previous_revision: int
+    changes: ChangeSummary
+    reused_elements: int
+
+class ElementChange(BaseModel):
+    """Schema for a single changed entity"""
+    global_id: str
+    type: str
+    name: Optional[str] = None
+
+class RevisionDiff(BaseModel):
+    """Schema for the changes between two revisions of a file"""
+    filename: str
+    from_revision: int
+    to_revision: int
+    summary: ChangeSummary
+    added: List[ElementChange]
+    removed: List[ElementChange]
+    modified: List[ElementChange]
+
 class HealthResponse(BaseModel):
     """Schema for health check response"""
     status: str
     model_initialized: bool
+    ready: bool = False
 
 class ErrorResponse(BaseModel):
     """Schema for error responses"""
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from models.schemas import HealthResponse
 from services.ai_service import ai_service
+from services.warmup_service import warmup_service
 
 router = APIRouter(
     prefix="/health",
@@ -12,9 +14,21 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "model_initialized": ai_service.initialized
+        "model_initialized": ai_service.initialized,
+        "ready": warmup_service.ready
     }
 
+@router.get("/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness():
+    """Readiness probe: 503 until the model client is initialized and recent uploads are warmed up"""
+    status = warmup_service.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 @router.get("/model")
 async def model_status():
     """Check if the AI model is initialized"""
@@ -1,32 +1,114 @@
-from fastapi import APIRouter, HTTPException
-from models.schemas import Query, ErrorResponse
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query as QueryParam
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from models.schemas import Query, QueryResponse, ResultPage, ErrorResponse, SuccessResponse
+from services.admission_service import admission_service
 from services.ai_service import ai_service
 from services.ifc_service import ifc_service
-from utils.error_handling import FileNotFoundError, AIError, handle_app_exception
+from services.result_service import result_service
+from services.session_service import session_service
+from utils.error_handling import FileNotFoundError, AIError, QueueFullError, handle_app_exception
 
 router = APIRouter(
     prefix="/query",
     tags=["query"],
-    responses={404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
+    responses={404: {"model": ErrorResponse}, 429: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
 )
 
-@router.post("")
-async def process_query(query: Query):
+@router.post("", response_model=QueryResponse)
+async def process_query(query: Query, response: Response):
     """Process a query about an IFC file"""
     try:
         if not query.file_path:
             raise HTTPException(status_code=400, detail="No file path provided")
         
-        # Check if the file exists
-        if not ifc_service.load_file(query.file_path):
-            raise FileNotFoundError(f"File not found: {query.file_path}")
-        
-        # Process the query
-        result = ai_service.process_query(query.message, query.file_path)
-        return {"response": result}
+        # Wait for a slot, then run the blocking pipeline off the event loop
+        async with admission_service.admit(query.file_path, query.priority, query.ticket_id) as admission:
+            response.headers["X-Queue-Ticket"] = admission["ticket_id"]
+            response.headers["X-Queue-Position"] = str(admission["position"])
+            response.headers["X-Queue-Wait"] = f"{admission['waited']:.2f}"
+            
+            # Check if the file exists
+            if not await run_in_threadpool(ifc_service.load_file, query.file_path):
+                raise FileNotFoundError(f"File not found: {query.file_path}")
+            
+            # Process the query within its conversation session
+            session = session_service.get_session(query.session_id, query.file_path)
+            page = await run_in_threadpool(ai_service.process_query, query.message, query.file_path, session)
+        return {
+            "response": result_service.preview(page),
+            "session_id": session.session_id,
+            "result": page
+        }
+    except QueueFullError as e:
+        return handle_app_exception(None, e)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except AIError as e:
         return handle_app_exception(None, e)
     except Exception as e:
-        return handle_app_exception(None, AIError(f"Error processing query: {str(e)}")) 
\ No newline at end of file
+        return handle_app_exception(None, AIError(f"Error processing query: {str(e)}")) 
+
+@router.get("/queue")
+async def queue_status():
+    """Get query queue lengths and estimated waits"""
+    return admission_service.status()
+
+@router.get("/queue/{ticket_id}")
+async def ticket_status(ticket_id: str):
+    """Get whether a query is running, or its queue position and estimated wait"""
+    status = admission_service.ticket_status(ticket_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} is not queued or running")
+    return status
+
+@router.delete("/sessions/{session_id}", response_model=SuccessResponse)
+async def delete_session(session_id: str):
+    """End a conversation session and free its variables"""
+    if not session_service.delete_session(session_id):
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return {"message": f"Session {session_id} deleted successfully"}
+
+@router.get("/results/{result_id}", response_model=ResultPage)
+async def get_result_page(result_id: str, cursor: Optional[str] = None, limit: Optional[int] = QueryParam(None, ge=1)):
+    """Get a page of a stored query result"""
+    try:
+        page = result_service.get_page(result_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"Result {result_id} not found or expired")
+    return page
+
+@router.get("/results/{result_id}/stream")
+async def stream_result(result_id: str):
+    """Stream a stored query result as NDJSON"""
+    lines = result_service.iter_ndjson(result_id)
+    if lines is None:
+        raise HTTPException(status_code=404, detail=f"Result {result_id} not found or expired")
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@router.get("/results/{result_id}/export")
+async def export_result(result_id: str, format: str = "csv"):
+    """Export a stored query result as CSV or Parquet"""
+    if format == "csv":
+        chunks = result_service.iter_csv(result_id)
+        if chunks is None:
+            raise HTTPException(status_code=404, detail=f"Result {result_id} not found or expired")
+        return StreamingResponse(
+            chunks, media_type="text/csv",
+            headers={"Content-Disposition": f"attachment; filename={result_id}.csv"}
+        )
+    if format == "parquet":
+        try:
+            content = result_service.export_parquet(result_id)
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Parquet export requires pyarrow to be installed")
+        if content is None:
+            raise HTTPException(status_code=404, detail=f"Result {result_id} not found or expired")
+        return Response(
+            content, media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": f"attachment; filename={result_id}.parquet"}
+        )
+    raise HTTPException(status_code=400, detail="Export format must be 'csv' or 'parquet'")
@@ -1,7 +1,12 @@
+import asyncio
+from typing import Dict, Optional
 from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-from models.schemas import FileInfo, FileList, SuccessResponse, ErrorResponse
+from models.schemas import FileInfo, FileList, SuccessResponse, ErrorResponse, RevisionInfo, RevisionDiff
 from models.file_model import file_storage
+from services.ifc_service import ifc_service
+from services.revision_service import revision_service
 from utils.storage import save_uploaded_file, delete_file
 from utils.security import is_safe_filename
 from utils.error_handling import FileUploadError, FileNotFoundError, handle_app_exception
@@ -12,6 +17,9 @@ router = APIRouter(
     responses={404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
 )
 
+# Per-file locks so concurrent revisions are diffed and registered one after another
+revision_locks: Dict[str, asyncio.Lock] = {}
+
 @router.get("", response_model=FileList)
 async def list_files():
     """List all uploaded files"""
@@ -49,6 +57,76 @@ async def upload_file(file: UploadFile = File(...), background_tasks: Background
     except Exception as e:
         return handle_app_exception(None, FileUploadError(f"Error uploading file: {str(e)}"))
 
+@router.post("/{filename}/revisions", response_model=RevisionInfo)
+async def upload_revision(filename: str, file: UploadFile = File(...)):
+    """Upload an IFC file as a new revision of an existing file"""
+    try:
+        if file_storage.get_file(filename) is None:
+            raise FileNotFoundError(f"File {filename} not found")
+        
+        # Validate file extension
+        if not is_safe_filename(file.filename):
+            raise FileUploadError("Only .ifc files are allowed")
+        
+        # Read and save the file
+        content = await file.read()
+        safe_filename, file_path, file_size = save_uploaded_file(content, file.filename)
+        
+        # Parse and diff before registering, so a broken upload never becomes the current revision.
+        # Both are slow, so they run off the event loop
+        try:
+            try:
+                await run_in_threadpool(ifc_service.load_file, file_path)
+            except FileNotFoundError as e:
+                raise FileUploadError(f"Invalid IFC file: {e.message}")
+            
+            # Read the previous revision under the lock, so it is still current when this one is added
+            async with revision_locks.setdefault(filename, asyncio.Lock()):
+                previous = file_storage.get_file(filename)
+                if previous is None:
+                    raise FileNotFoundError(f"File {filename} not found")
+                
+                # Diff against the previous revision and reuse data of unchanged elements
+                diff = await run_in_threadpool(revision_service.compute_diff, previous["file_path"], file_path)
+                reused = await run_in_threadpool(
+                    ifc_service.carry_over_element_data, previous["file_path"], file_path, diff["unchanged"]
+                )
+                file_info = file_storage.add_revision(filename, file_path, file_size)
+        except Exception:
+            delete_file(file_path)
+            ifc_service.evict(file_path)
+            revision_service.forget(file_path)
+            raise
+        
+        return {
+            **file_info,
+            "previous_revision": previous["revision"],
+            "changes": revision_service.summarize(diff),
+            "reused_elements": reused
+        }
+    except FileUploadError as e:
+        return handle_app_exception(None, e)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=e.message)
+    except ValueError as e:
+        return handle_app_exception(None, FileUploadError(str(e)))
+    except Exception as e:
+        return handle_app_exception(None, FileUploadError(f"Error uploading revision: {str(e)}"))
+
+@router.get("/{filename}/changes", response_model=RevisionDiff)
+async def get_changes(filename: str, from_revision: Optional[int] = None,
+                      to_revision: Optional[int] = None, ifc_type: Optional[str] = None):
+    """Get what changed between two revisions of a file"""
+    try:
+        changes = await run_in_threadpool(revision_service.get_changes, filename, from_revision, to_revision, ifc_type)
+        if changes is None:
+            raise FileNotFoundError(f"Revisions of {filename} not found")
+        return changes
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=e.message)
+    except Exception as e:
+        return handle_app_exception(None, FileUploadError(f"Error comparing revisions: {str(e)}"))
+
 @router.delete("/{filename}", response_model=SuccessResponse)
 async def delete_file_endpoint(filename: str):
     """Delete an uploaded file"""
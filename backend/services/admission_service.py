@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+import math
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Set, Tuple
+from config import (
+    MAX_CONCURRENT_QUERIES, MAX_CONCURRENT_QUERIES_PER_FILE, MAX_QUEUED_QUERIES,
+    QUERY_QUEUE_TIMEOUT, QUERY_PRIORITIES, INITIAL_QUERY_DURATION
+)
+from utils.error_handling import QueueFullError
+
+class AdmissionService:
+    """Service limiting how many queries run at once, queueing the rest by priority"""
+
+    def __init__(self):
+        self.running = 0
+        self.running_per_file: Dict[str, int] = {}
+        self.waiters: List[Tuple[int, int, str, str, asyncio.Future]] = []  # (rank, sequence, ticket_id, file_path, future)
+        self.running_tickets: Set[str] = set()
+        self.sequence = itertools.count()
+        self.average_duration = INITIAL_QUERY_DURATION
+
+    @asynccontextmanager
+    async def admit(self, file_path: str, priority: str = "interactive", ticket_id: Optional[str] = None):
+        """
+        Hold a query slot for the duration of the block
+
+        Args:
+            file_path: The IFC file the query is about
+            priority: A key of QUERY_PRIORITIES
+            ticket_id: Client-chosen ID to poll the query's place in the queue with;
+                a new one is generated if missing or already in use
+
+        Yields:
+            Dictionary with the ticket_id, the 1-based queue position on arrival
+            (0 if the query started at once) and the seconds spent waiting
+
+        Raises:
+            QueueFullError: If the queue is full or the wait timed out
+        """
+        if not ticket_id or self.ticket_status(ticket_id) is not None:
+            ticket_id = uuid.uuid4().hex
+        admission = await self._acquire(ticket_id, file_path, QUERY_PRIORITIES[priority])
+        started = time.monotonic()
+        try:
+            yield admission
+        finally:
+            self._release(ticket_id, file_path, time.monotonic() - started)
+
+    def estimate_wait(self, ahead: int) -> float:
+        """Estimate seconds until a query with the given number of queries ahead of it starts"""
+        if ahead == 0 and self.running < MAX_CONCURRENT_QUERIES:
+            return 0.0
+        return math.ceil((ahead + 1) / MAX_CONCURRENT_QUERIES) * self.average_duration
+
+    def ticket_status(self, ticket_id: str) -> Optional[dict]:
+        """Get whether a query is running or its position and estimated wait in the queue"""
+        if ticket_id in self.running_tickets:
+            return {"ticket_id": ticket_id, "status": "running"}
+        position = self._position(ticket_id)
+        if position is None:
+            return None
+        return {
+            "ticket_id": ticket_id,
+            "status": "queued",
+            "position": position,
+            "estimated_wait": round(self.estimate_wait(position - 1), 2)
+        }
+
+    def status(self) -> dict:
+        """Get queue lengths and the estimated wait for a new query of each priority"""
+        return {
+            "running": self.running,
+            "queued": len(self.waiters),
+            "max_concurrent": MAX_CONCURRENT_QUERIES,
+            "max_queued": MAX_QUEUED_QUERIES,
+            "average_duration": round(self.average_duration, 2),
+            "queued_by_priority": {
+                priority: sum(1 for w in self.waiters if w[0] == rank)
+                for priority, rank in QUERY_PRIORITIES.items()
+            },
+            "estimated_wait": {
+                priority: round(self.estimate_wait(self._ahead_of(rank)), 2)
+                for priority, rank in QUERY_PRIORITIES.items()
+            }
+        }
+
+    async def _acquire(self, ticket_id: str, file_path: str, rank: int) -> dict:
+        """Wait for a slot, returning the admission details"""
+        # Waiters left in the queue are blocked on capacity, so a query that fits may start now
+        if self._has_capacity(file_path):
+            self._start(ticket_id, file_path)
+            return {"ticket_id": ticket_id, "position": 0, "waited": 0.0}
+
+        if len(self.waiters) >= MAX_QUEUED_QUERIES:
+            retry_after = math.ceil(self.estimate_wait(len(self.waiters)))
+            raise QueueFullError(
+                "Server is busy, please retry later",
+                retry_after=max(retry_after, 1),
+                detail={"queued": len(self.waiters), "estimated_wait": retry_after}
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (rank, next(self.sequence), ticket_id, file_path, future)
+        self.waiters.append(waiter)
+        position = self._position(ticket_id)
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait({future}, timeout=QUERY_QUEUE_TIMEOUT)
+        except asyncio.CancelledError:
+            # Client went away, give back a slot granted in the meantime
+            if future.done():
+                self._release(ticket_id, file_path, None)
+            else:
+                self.waiters.remove(waiter)
+            raise
+
+        if not future.done():
+            current_position = self._position(ticket_id)
+            self.waiters.remove(waiter)
+            retry_after = math.ceil(self.estimate_wait(current_position - 1))
+            raise QueueFullError(
+                f"Timed out after waiting {QUERY_QUEUE_TIMEOUT} seconds for a free slot",
+                retry_after=max(retry_after, 1),
+                detail={
+                    "ticket_id": ticket_id,
+                    "position": current_position,
+                    "queued": len(self.waiters) + 1,
+                    "estimated_wait": retry_after
+                }
+            )
+        return {"ticket_id": ticket_id, "position": position, "waited": time.monotonic() - queued_at}
+
+    def _release(self, ticket_id: str, file_path: str, duration: Optional[float]):
+        """Free a slot, update the duration estimate and start waiting queries"""
+        self.running_tickets.discard(ticket_id)
+        self.running -= 1
+        self.running_per_file[file_path] -= 1
+        if not self.running_per_file[file_path]:
+            del self.running_per_file[file_path]
+        if duration is not None:
+            self.average_duration = 0.8 * self.average_duration + 0.2 * duration
+        self._dispatch()
+
+    def _dispatch(self):
+        """Start the highest-priority waiters whose file has capacity"""
+        for waiter in sorted(self.waiters):
+            if self.running >= MAX_CONCURRENT_QUERIES:
+                break
+            ticket_id, file_path, future = waiter[2], waiter[3], waiter[4]
+            if self._has_capacity(file_path):
+                self.waiters.remove(waiter)
+                self._start(ticket_id, file_path)
+                future.set_result(None)
+
+    def _start(self, ticket_id: str, file_path: str):
+        """Take a slot"""
+        self.running_tickets.add(ticket_id)
+        self.running += 1
+        self.running_per_file[file_path] = self.running_per_file.get(file_path, 0) + 1
+
+    def _has_capacity(self, file_path: str) -> bool:
+        """Check whether a query on the file may start now"""
+        return (self.running < MAX_CONCURRENT_QUERIES
+                and self.running_per_file.get(file_path, 0) < MAX_CONCURRENT_QUERIES_PER_FILE)
+
+    def _position(self, ticket_id: str) -> Optional[int]:
+        """Get the 1-based position of a waiting query in serving order"""
+        for position, waiter in enumerate(sorted(self.waiters), start=1):
+            if waiter[2] == ticket_id:
+                return position
+        return None
+
+    def _ahead_of(self, rank: int) -> int:
+        """Count waiters that would be served before a new query of the given rank"""
+        return sum(1 for w in self.waiters if w[0] <= rank)
+
+# Create a singleton instance
+admission_service = AdmissionService()
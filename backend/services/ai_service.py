@@ -1,5 +1,4 @@
 import time
-import google.generativeai as genai
 from config import GENAI_API_KEY, MODEL_NAME, MAX_RETRIES, RETRY_DELAY
 from utils.error_handling import AIError
 
@@ -13,6 +12,8 @@ class AIService:
     def initialize(self):
         """Initialize the AI model"""
         try:
+            # Imported here since it is slow to import and only queries need it
+            import google.generativeai as genai
             genai.configure(api_key=GENAI_API_KEY)
             self.model = genai.GenerativeModel(MODEL_NAME)
             self.initialized = True
@@ -33,12 +34,18 @@ class AIService:
         except Exception as e:
             raise AIError(f"Error generating code: {str(e)}")
     
-    def process_query(self, query: str, ifc_file_path: str) -> str:
-        """Process a query about an IFC file"""
-        from services.ifc_service import IFCService
-        from utils.security import clean_code, execute_code
-
-        ifc_service = IFCService()
+    def process_query(self, query: str, ifc_file_path: str, session=None) -> dict:
+        """
+        Process a query about an IFC file, continuing the given session if any
+        
+        Returns:
+            The first page of the structured result, see ResultService.build_result
+        """
+        from services.ifc_service import ifc_service
+        from services.relationship_service import relationship_service
+        from services.result_service import result_service
+        from services.session_service import session_service
+        from utils.security import clean_code, run_code
 
         # Initialize error context for feedback loop
         error_context = []
@@ -51,7 +58,8 @@ class AIService:
         GENERAL INSTRUCTIONS:
         - The ifc_file variable is already initialized and loaded. *DO NOT reopen or redefine it*.
         - *Never modify the IFC file.* This is read-only analysis.
-        - All output must be stored in a variable named result and be plain text (no markdown, no backticks, no code blocks).
+        - All output must be stored in a variable named result. Use a list of dicts (one dict per row, same keys in each) for lists of elements or tabular answers, and a number or short plain-text string otherwise (no markdown, no backticks, no code blocks).
+        - Never join many rows into one long string; the result is paginated and rendered as a table.
         - Use only ifcopenshell, ifcopenshell.util.element, and standard libraries. No external packages.
         - Avoid exec() or eval() at all times.
 
@@ -63,11 +71,21 @@ class AIService:
         - Doors → ifc_file.by_type("IfcDoor")
         - Quantities → typically in IfcElementQuantity or psets with keys like Area, Length, Height, Width
 
+        RELATIONSHIP HELPERS (already defined, prefer them over walking inverse attributes):
+        - elements_in_storey(storey, ifc_type=None) → elements on a storey (entity or Name, e.g. "Level 1"), including those in its spaces
+        - storey_of(element) → the IfcBuildingStorey containing the element, or None
+        - type_of(element) → the element's type object, or None
+        - elements_of_type(type_object, ifc_type=None) → occurrences of a type object (entity or Name)
+        - openings_of(element) → IfcOpeningElements voiding the element
+        - fillings_of(element, ifc_type=None) → doors/windows filling the element's openings
+        - host_of(element) → the wall or slab a door/window sits in, or None
+        - parts_of(element, ifc_type=None) / parent_of(element) → aggregation children / parent
+        Example: doors = elements_in_storey("Level 1", "IfcDoor")
+
         COMMON PROPERTY SET ACCESS:
-        Use:
+        Use the predefined, cached helper (do not import ifcopenshell.util.element for this):
         python
-        import ifcopenshell.util.element as util
-        psets = util.get_psets(element)
+        psets = get_psets(element)
 
         DIMENSION HANDLING:
         - If OverallWidth or OverallHeight is missing (None or not present), try extracting dimensions from the element's Name using regex.
@@ -92,7 +110,7 @@ class AIService:
         - columns (e.g., "M_Concrete-Rectangular-Column:200 x 750mm")
         - beams (e.g., "M_Concrete-Rectangular Beam:200 x 600mm")
 
-        
+        {self._session_context(session)}
         Query: {query}
 
         
@@ -117,13 +135,24 @@ class AIService:
                 print(f"\nGenerated Code (Attempt {attempt + 1}):\n{code}")
 
                 ifc_file = ifc_service.load_file(ifc_file_path)
-                result = execute_code(code, ifc_file)
-
-                if "Error" not in result and "Traceback" not in result:
-                    return result  # Success
+                index = relationship_service.get_index(ifc_file_path, ifc_file)
+                if session:
+                    session_service.bind_model(session, ifc_file)
+                # Run on a copy so a failed attempt leaves the session's containers untouched
+                exec_namespace = session.copy_namespace() if session else {}
+                helpers = {**index.helpers(), **ifc_service.element_helpers(ifc_file_path, ifc_file)}
+                error_trace = run_code(code, ifc_file, exec_namespace, helpers)
+
+                if error_trace is None:
+                    page = result_service.build_result(exec_namespace.get('result'))
+                    if session:
+                        session_service.record_turn(
+                            session, query, code, result_service.preview(page), exec_namespace, ifc_file
+                        )
+                    return page  # Success
                 else:
                     print(f"Attempt {attempt + 1}: Code execution failed.")
-                    error_msg = result.split('\n')[-1] if '\n' in result else result
+                    error_msg = error_trace.strip().split('\n')[-1]
                     error_context.append(f"Execution error: {error_msg}")
                     
                     if attempt < MAX_RETRIES:
@@ -135,10 +164,6 @@ class AIService:
                         prompt += "- Validate all properties before access\n"
                         prompt += "- Consider alternative ways to find the requested information\n"
                         time.sleep(RETRY_DELAY)
-                    elif attempt >= MAX_RETRIES:
-                        return f"After several attempts, I couldn't process this query successfully. Here are the errors encountered:\n" + \
-                               "\n".join([f"- {err}" for err in error_context]) + \
-                               "\n\nPlease try rephrasing your query or provide more specific details about what you're looking for."
 
             except Exception as e:
                 error_context.append(f"System error: {str(e)}")
@@ -150,6 +175,30 @@ class AIService:
                     error_summary = "\n".join([f"- {err}" for err in error_context])
                     raise AIError(f"Failed after {MAX_RETRIES} attempts. Error summary:\n{error_summary}")
 
+        # Every attempt failed to generate or run code
+        return result_service.build_result(f"After several attempts, I couldn't process this query successfully. Here are the errors encountered:\n" + \
+               "\n".join([f"- {err}" for err in error_context]) + \
+               "\n\nPlease try rephrasing your query or provide more specific details about what you're looking for.")
+
+    def _session_context(self, session) -> str:
+        """Describe earlier turns and kept variables of a session for the prompt"""
+        if not session:
+            return ""
+        turns, variables = session.context()
+        if not turns:
+            return ""
+        
+        context = "CONVERSATION SO FAR (most recent last):\n"
+        for turn in turns:
+            context += f"        - Question: {turn['query']}\n"
+            context += f"          Answer: {turn['result'][:500]}\n"
+        
+        if variables:
+            context += "\n        AVAILABLE VARIABLES from earlier turns (already defined, reuse them instead of recomputing):\n"
+            for name, type_name in variables.items():
+                context += f"        - {name}: {type_name}\n"
+        context += "        - For follow-up questions, refine these variables rather than walking the model again.\n"
+        return context
 
 # Create a singleton instance
 ai_service = AIService()
\ No newline at end of file
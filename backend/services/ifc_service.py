@@ -1,18 +1,98 @@
-import ifcopenshell
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List
+from config import MODEL_CACHE_SIZE
+from models.file_model import file_storage
 from utils.error_handling import FileNotFoundError
 
 class IFCService:
     """Service for IFC file processing"""
     
     def __init__(self):
-        pass
+        self.models: "OrderedDict[str, Any]" = OrderedDict()  # Parsed models, least recently used first
+        self.element_data: Dict[str, Dict[str, Dict[str, Any]]] = {}  # file_path -> GlobalId -> derived data
+        self.lock = threading.Lock()  # Guards the caches, queries run in worker threads
+        self.loading: Dict[str, threading.Lock] = {}  # Per-file locks so a file is parsed only once
+        self.evict_hooks: List[Callable[[str], None]] = []  # Called when a parsed model leaves the cache
     
     def load_file(self, file_path: str):
-        """Load an IFC file"""
-        try:
-            return ifcopenshell.open(file_path)
-        except Exception as e:
-            raise FileNotFoundError(f"Error loading IFC file: {str(e)}")
+        """Load an IFC file, reusing the parsed model if it is cached"""
+        if not os.path.isfile(file_path):
+            self.evict(file_path)
+            raise FileNotFoundError(f"Error loading IFC file: {file_path} does not exist")
+        
+        with self.lock:
+            file_lock = self.loading.setdefault(file_path, threading.Lock())
+        
+        with file_lock:
+            with self.lock:
+                if file_path in self.models:
+                    self.models.move_to_end(file_path)
+                    return self.models[file_path]
+            
+            try:
+                # Imported here so routes that never parse a model skip its import cost
+                import ifcopenshell
+                ifc_file = ifcopenshell.open(file_path)
+            except Exception as e:
+                raise FileNotFoundError(f"Error loading IFC file: {str(e)}")
+            
+            evicted = []
+            with self.lock:
+                self.models[file_path] = ifc_file
+                while len(self.models) > MODEL_CACHE_SIZE:
+                    evicted.append(self.models.popitem(last=False)[0])
+            # Outside the lock, hooks take locks of their own
+            for path in evicted:
+                self._run_evict_hooks(path)
+            return ifc_file
+    
+    def is_cached(self, file_path: str, ifc_file) -> bool:
+        """Check whether a parsed model is still the cached model of a file"""
+        with self.lock:
+            return self.models.get(file_path) is ifc_file
+    
+    def register_evict_hook(self, hook: Callable[[str], None]):
+        """Register a callback invoked with the path of every model dropped from the cache"""
+        self.evict_hooks.append(hook)
+    
+    def evict(self, file_path: str):
+        """Drop the cached model and derived element data for a file"""
+        with self.lock:
+            self.models.pop(file_path, None)
+            self.element_data.pop(file_path, None)
+            self.loading.pop(file_path, None)
+        self._run_evict_hooks(file_path)
+    
+    def _run_evict_hooks(self, file_path: str):
+        """Let other caches drop what they hold for an evicted model"""
+        for hook in self.evict_hooks:
+            hook(file_path)
+    
+    def get_element_data(self, file_path: str, global_id: str, key: str, compute: Callable[[], Any]) -> Any:
+        """Get derived data for an element, computing and caching it on first use"""
+        with self.lock:
+            entry = self.element_data.setdefault(file_path, {}).setdefault(global_id, {})
+            if key in entry:
+                return entry[key]
+        
+        # Compute outside the lock; a concurrent duplicate computation is harmless
+        value = compute()
+        with self.lock:
+            return entry.setdefault(key, value)
+    
+    def carry_over_element_data(self, old_path: str, new_path: str, global_ids: Iterable[str]) -> int:
+        """Reuse derived data of unchanged elements from a previous revision"""
+        with self.lock:
+            old_data = self.element_data.get(old_path, {})
+            new_data = self.element_data.setdefault(new_path, {})
+            reused = 0
+            for global_id in global_ids:
+                if global_id in old_data and global_id not in new_data:
+                    new_data[global_id] = dict(old_data[global_id])
+                    reused += 1
+            return reused
     
     # def get_file_info(self, ifc_file):
     #     """Get basic information about an IFC file"""
@@ -38,8 +118,37 @@ class IFCService:
     #     except Exception as e:
     #         return {"error": f"Error getting file info: {str(e)}"}
     
-    def get_property_sets(self, ifc_file, entity):
-        """Get property sets for an entity"""
+    def element_helpers(self, file_path: str, ifc_file) -> Dict[str, Any]:
+        """Get the cached per-element helpers exposed to generated code"""
+        return {"get_psets": lambda element: self.get_property_sets(ifc_file, element, file_path)}
+    
+    def get_property_sets(self, ifc_file, entity, file_path: str = None):
+        """
+        Get property sets for an entity
+        
+        When file_path is given the result is cached per GlobalId, so it can
+        be reused by later revisions. Cached psets leave out the STEP "id"
+        keys, which differ between revisions.
+        """
+        global_id = getattr(entity, "GlobalId", None)
+        if not (file_path and global_id):
+            return self._read_property_sets(entity)
+        
+        try:
+            psets = self.get_element_data(
+                file_path, global_id, "psets",
+                lambda: {
+                    name: {k: v for k, v in props.items() if k != "id"}
+                    for name, props in self._read_property_sets(entity, raise_errors=True).items()
+                }
+            )
+        except Exception as e:
+            return {"error": f"Error getting property sets: {str(e)}"}
+        # Hand out copies so generated code cannot alter the cache
+        return {name: dict(props) for name, props in psets.items()}
+    
+    def _read_property_sets(self, entity, raise_errors: bool = False):
+        """Read property sets for an entity from the model"""
         try:
             import ifcopenshell.util.element as element_util
             return element_util.get_psets(entity)
@@ -56,7 +165,10 @@ class IFCService:
                                     psets[prop_set.Name][prop.Name] = prop.NominalValue.wrappedValue
             return psets
         except Exception as e:
+            if raise_errors:
+                raise
             return {"error": f"Error getting property sets: {str(e)}"}
 
 # Create a singleton instance
-ifc_service = IFCService() 
\ No newline at end of file
+ifc_service = IFCService()
+file_storage.register_delete_hook(ifc_service.evict) 
\ No newline at end of file
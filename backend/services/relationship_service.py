@@ -0,0 +1,231 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from config import MODEL_CACHE_SIZE
+from models.file_model import file_storage
+from services.ifc_service import ifc_service
+
+# Helper functions exposed to generated code, alongside the index itself as 'ifc_index'
+HELPER_NAMES = (
+    "elements_in_storey", "storey_of", "type_of", "elements_of_type",
+    "openings_of", "fillings_of", "host_of", "parts_of", "parent_of"
+)
+
+class Adjacency:
+    """Read-only one-to-many mapping between entity ids, stored as sorted integer arrays"""
+
+    def __init__(self, pairs: Iterable[Tuple[int, int]]):
+        self.keys = array("i")
+        self.offsets = array("i")
+        self.values = array("i")
+        for key, value in sorted(set(pairs)):
+            if not self.keys or self.keys[-1] != key:
+                self.keys.append(key)
+                self.offsets.append(len(self.values))
+            self.values.append(value)
+        self.offsets.append(len(self.values))
+
+    def get(self, key: int) -> array:
+        """Get the ids related to an id"""
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return self.values[self.offsets[index]:self.offsets[index + 1]]
+        return array("i")
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+class RelationshipIndex:
+    """Index of the spatial structure, type and opening relationships of one IFC model"""
+
+    def __init__(self, ifc_file: Any):
+        self.ifc_file = ifc_file
+
+        contains, aggregates, types, voids, fills = [], [], [], [], []
+        for rel in ifc_file.by_type("IfcRelContainedInSpatialStructure"):
+            contains.extend((rel.RelatingStructure.id(), e.id()) for e in rel.RelatedElements)
+        for rel in ifc_file.by_type("IfcRelAggregates"):
+            aggregates.extend((rel.RelatingObject.id(), e.id()) for e in rel.RelatedObjects)
+        for rel in ifc_file.by_type("IfcRelDefinesByType"):
+            types.extend((rel.RelatingType.id(), e.id()) for e in rel.RelatedObjects)
+        for rel in ifc_file.by_type("IfcRelVoidsElement"):
+            voids.append((rel.RelatingBuildingElement.id(), rel.RelatedOpeningElement.id()))
+        for rel in ifc_file.by_type("IfcRelFillsElement"):
+            fills.append((rel.RelatingOpeningElement.id(), rel.RelatedBuildingElement.id()))
+
+        self.contained = Adjacency(contains)
+        self.container = Adjacency((e, s) for s, e in contains)
+        self.parts = Adjacency(aggregates)
+        self.parent = Adjacency((p, w) for w, p in aggregates)
+        self.typed = Adjacency(types)
+        self.type = Adjacency((e, t) for t, e in types)
+        self.openings = Adjacency(voids)
+        self.voided = Adjacency((o, e) for e, o in voids)
+        self.fillings = Adjacency(fills)
+        self.filled = Adjacency((f, o) for o, f in fills)
+
+        self.storeys: Dict[str, List[int]] = {}
+        for storey in ifc_file.by_type("IfcBuildingStorey"):
+            self.storeys.setdefault((storey.Name or "").lower(), []).append(storey.id())
+
+    def elements_in_storey(self, storey: Any, ifc_type: Optional[str] = None) -> list:
+        """
+        Get the elements contained in a storey, including those in its spaces
+
+        Args:
+            storey: An IfcBuildingStorey, its id, or its Name
+            ifc_type: Only return elements of this IFC class (subclasses included)
+
+        Returns:
+            List of contained elements
+        """
+        if isinstance(storey, str):
+            pending = list(self.storeys.get(storey.lower(), []))
+        else:
+            pending = [self._id(storey)]
+
+        # Walk spaces and other spatial parts aggregated under the storey
+        element_ids = []
+        seen = set()
+        while pending:
+            structure_id = pending.pop()
+            if structure_id in seen:
+                continue
+            seen.add(structure_id)
+            element_ids.extend(self.contained.get(structure_id))
+            pending.extend(self.parts.get(structure_id))
+        return self._entities(element_ids, ifc_type)
+
+    def storey_of(self, element: Any) -> Optional[Any]:
+        """Get the storey an element is contained in, looking through spaces"""
+        pending = list(self.container.get(self._id(element)))
+        seen = set()
+        while pending:
+            structure = self.ifc_file.by_id(pending.pop())
+            if structure.id() in seen:
+                continue
+            seen.add(structure.id())
+            if structure.is_a("IfcBuildingStorey"):
+                return structure
+            pending.extend(self.parent.get(structure.id()))
+        return None
+
+    def type_of(self, element: Any) -> Optional[Any]:
+        """Get the type object of an element"""
+        return self._first(self.type.get(self._id(element)))
+
+    def elements_of_type(self, type_object: Any, ifc_type: Optional[str] = None) -> list:
+        """Get the occurrences of a type object, given as entity, id or Name"""
+        if isinstance(type_object, str):
+            type_ids = [t.id() for t in self.ifc_file.by_type("IfcTypeObject") if t.Name == type_object]
+        else:
+            type_ids = [self._id(type_object)]
+        element_ids = [e for t in type_ids for e in self.typed.get(t)]
+        return self._entities(element_ids, ifc_type)
+
+    def openings_of(self, element: Any) -> list:
+        """Get the openings voiding an element"""
+        return self._entities(self.openings.get(self._id(element)))
+
+    def fillings_of(self, element: Any, ifc_type: Optional[str] = None) -> list:
+        """Get the doors, windows and other elements filling an element's openings"""
+        filling_ids = [f for o in self.openings.get(self._id(element)) for f in self.fillings.get(o)]
+        return self._entities(filling_ids, ifc_type)
+
+    def host_of(self, element: Any) -> Optional[Any]:
+        """Get the element whose opening a door or window fills"""
+        opening_ids = self.filled.get(self._id(element))
+        if not opening_ids:
+            return None
+        return self._first(self.voided.get(opening_ids[0]))
+
+    def parts_of(self, element: Any, ifc_type: Optional[str] = None) -> list:
+        """Get the objects aggregated under an element"""
+        return self._entities(self.parts.get(self._id(element)), ifc_type)
+
+    def parent_of(self, element: Any) -> Optional[Any]:
+        """Get the object an element is aggregated into"""
+        return self._first(self.parent.get(self._id(element)))
+
+    def helpers(self) -> Dict[str, Any]:
+        """Get the namespace entries exposed to generated code"""
+        namespace = {name: getattr(self, name) for name in HELPER_NAMES}
+        namespace["ifc_index"] = self
+        return namespace
+
+    def _id(self, element: Any) -> int:
+        """Get the entity id of an element or id"""
+        return element if isinstance(element, int) else element.id()
+
+    def _first(self, ids: array) -> Optional[Any]:
+        """Resolve the first of some ids to an entity"""
+        return self.ifc_file.by_id(ids[0]) if ids else None
+
+    def _entities(self, ids: Iterable[int], ifc_type: Optional[str] = None) -> list:
+        """Resolve ids to entities, optionally filtered by IFC class"""
+        entities = [self.ifc_file.by_id(i) for i in dict.fromkeys(ids)]
+        if ifc_type:
+            entities = [e for e in entities if e.is_a(ifc_type)]
+        return entities
+
+class RelationshipService:
+    """Service for building and caching relationship indexes per model"""
+
+    def __init__(self):
+        self.indexes: "OrderedDict[str, RelationshipIndex]" = OrderedDict()  # Least recently used first
+        self.lock = threading.Lock()  # Guards the cache, queries run in worker threads
+        self.building: Dict[str, threading.Lock] = {}  # Per-file locks so an index is built only once
+
+    def get_index(self, file_path: str, ifc_file: Any = None) -> RelationshipIndex:
+        """
+        Get the relationship index of a file, building it in one pass on first use
+
+        Args:
+            file_path: Path to the IFC file
+            ifc_file: The already loaded model, so the index matches the model the caller uses
+
+        Returns:
+            The index of ifc_file
+        """
+        if ifc_file is None:
+            ifc_file = ifc_service.load_file(file_path)
+        with self.lock:
+            file_lock = self.building.setdefault(file_path, threading.Lock())
+
+        with file_lock:
+            with self.lock:
+                index = self.indexes.get(file_path)
+                # Rebuild if the model was re-parsed since the index was built
+                if index is not None and index.ifc_file is ifc_file:
+                    self.indexes.move_to_end(file_path)
+                    return index
+
+            index = RelationshipIndex(ifc_file)
+
+            with self.lock:
+                # An index holds its model, so only cache it while the model cache does.
+                # Checked under the lock so a concurrent drop_index cannot be missed
+                if not ifc_service.is_cached(file_path, ifc_file):
+                    return index
+                self.indexes[file_path] = index
+                while len(self.indexes) > MODEL_CACHE_SIZE:
+                    self.indexes.popitem(last=False)
+            return index
+
+    def drop_index(self, file_path: str):
+        """Drop the index of a file whose model left the model cache"""
+        with self.lock:
+            self.indexes.pop(file_path, None)
+
+    def evict(self, file_path: str):
+        """Drop the index of a file"""
+        with self.lock:
+            self.indexes.pop(file_path, None)
+            self.building.pop(file_path, None)
+
+# Create a singleton instance
+relationship_service = RelationshipService()
+file_storage.register_delete_hook(relationship_service.evict)
+ifc_service.register_evict_hook(relationship_service.drop_index)
@@ -0,0 +1,303 @@
+import csv
+import io
+import json
+import math
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+from config import (
+    RESULT_PAGE_SIZE, MAX_RESULT_PAGE_SIZE, MAX_RESULT_ROWS,
+    MAX_STORED_RESULTS, RESULT_EXPIRY, RESULT_PREVIEW_ROWS
+)
+
+MAX_TEXT_LENGTH = 2000  # Longer text results are split into rows, longer table cells are cut off
+TEXT_CHUNK_LENGTH = 1000  # Longer lines are split into rows of this many characters
+PREVIEW_CELL_LENGTH = 200  # Longer cells are cut off in the plain-text preview
+CSV_BATCH_ROWS = 1000  # Rows written per streamed CSV chunk
+
+class ResultService:
+    """Service for turning query results into structured, paginated tables"""
+
+    def __init__(self):
+        self.results: "OrderedDict[str, dict]" = OrderedDict()  # Stored tables, least recently used first
+        self.lock = threading.Lock()  # Guards the store, queries run in worker threads
+
+    def to_table(self, value: Any) -> dict:
+        """
+        Convert the 'result' of generated code into a table with an explicit schema
+
+        Args:
+            value: Whatever the generated code stored in 'result'
+
+        Returns:
+            Dictionary with kind ("scalar", "text" or "table"), columns, rows and truncated flag
+        """
+        if value is None:
+            value = "No result returned"
+
+        if isinstance(value, str) and len(value) > MAX_TEXT_LENGTH:
+            kind, records = "text", ({"line": chunk} for chunk in self._text_chunks(value))
+        elif isinstance(value, (str, int, float, bool)):
+            kind, records = "scalar", iter([{"value": value}])
+        elif isinstance(value, dict):
+            kind, records = "table", self._dict_records(value)
+        elif self._is_entity(value):
+            kind, records = "table", iter([self._record(value)])
+        else:
+            try:
+                kind, records = "table", (self._record(item) for item in iter(value))
+            except TypeError:
+                kind, records = "scalar", iter([{"value": str(value)}])
+
+        # Column names must be strings, generated code may use any hashable key
+        rows_as_records = [
+            {str(name): cell for name, cell in record.items()}
+            for record in islice(records, MAX_RESULT_ROWS + 1)
+        ]
+        truncated = len(rows_as_records) > MAX_RESULT_ROWS
+        del rows_as_records[MAX_RESULT_ROWS:]
+
+        names: Dict[str, None] = {}
+        for record in rows_as_records:
+            names.update(dict.fromkeys(record))
+        names = list(names)
+        rows = [[self._cell(record.get(name)) for name in names] for record in rows_as_records]
+        columns = [
+            {"name": name, "type": self._column_type(row[i] for row in rows)}
+            for i, name in enumerate(names)
+        ]
+
+        # Mixed columns are declared "string", so make their cells strings too
+        for i, column in enumerate(columns):
+            if column["type"] == "string":
+                for row in rows:
+                    if row[i] is not None and not isinstance(row[i], str):
+                        row[i] = json.dumps(row[i]) if isinstance(row[i], (list, dict)) else str(row[i])
+                    row[i] = self._clip(row[i], MAX_TEXT_LENGTH)
+        return {"kind": kind, "columns": columns, "rows": rows, "truncated": truncated}
+
+    def build_result(self, value: Any) -> dict:
+        """Convert a result into its first page, storing it for paging, streaming and export"""
+        table = self.to_table(value)
+        result_id = self._store(table)
+        return self._page(table, result_id, 0, RESULT_PAGE_SIZE)
+
+    def get_page(self, result_id: str, cursor: Optional[str] = None, limit: Optional[int] = None) -> Optional[dict]:
+        """
+        Get a page of a stored result
+
+        Args:
+            result_id: The ID returned with the first page
+            cursor: The next_cursor of the previous page, or None for the first page
+            limit: Number of rows, capped at MAX_RESULT_PAGE_SIZE
+
+        Returns:
+            The page, or None if the result does not exist or has expired
+        
+        Raises:
+            ValueError: If the cursor is not an offset within the result
+        """
+        table = self._get(result_id)
+        if table is None:
+            return None
+        try:
+            offset = int(cursor) if cursor else 0
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        if not 0 <= offset <= len(table["rows"]):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        limit = min(limit or RESULT_PAGE_SIZE, MAX_RESULT_PAGE_SIZE)
+        return self._page(table, result_id, offset, limit)
+
+    def iter_ndjson(self, result_id: str) -> Optional[Iterator[str]]:
+        """Stream a stored result as NDJSON: a schema line followed by one record per line"""
+        table = self._get(result_id)
+        if table is None:
+            return None
+
+        def generate():
+            header = {"columns": table["columns"], "total_rows": len(table["rows"]), "truncated": table["truncated"]}
+            yield json.dumps(header) + "\n"
+            names = [column["name"] for column in table["columns"]]
+            for row in table["rows"]:
+                yield json.dumps(dict(zip(names, row))) + "\n"
+        return generate()
+
+    def iter_csv(self, result_id: str) -> Optional[Iterator[str]]:
+        """Stream a stored result as CSV in batches of rows"""
+        table = self._get(result_id)
+        if table is None:
+            return None
+
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow([column["name"] for column in table["columns"]])
+            for start in range(0, len(table["rows"]), CSV_BATCH_ROWS):
+                for row in table["rows"][start:start + CSV_BATCH_ROWS]:
+                    writer.writerow([json.dumps(cell) if isinstance(cell, (list, dict)) else cell for cell in row])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        return generate()
+
+    def export_parquet(self, result_id: str) -> Optional[bytes]:
+        """Export a stored result as a Parquet file (requires pyarrow)"""
+        table = self._get(result_id)
+        if table is None:
+            return None
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        data = {}
+        for i, column in enumerate(table["columns"]):
+            values = [row[i] for row in table["rows"]]
+            if column["type"] == "json":
+                values = [None if v is None else json.dumps(v) for v in values]
+            data[column["name"]] = values
+        buffer = io.BytesIO()
+        pq.write_table(pa.table(data), buffer)
+        return buffer.getvalue()
+
+    def preview(self, page: dict) -> str:
+        """Render the first rows of a result page as plain text"""
+        rows = page["rows"]
+        if page["kind"] == "scalar":
+            return str(rows[0][0]) if rows else ""
+
+        lines = []
+        if page["kind"] == "table" and len(page["columns"]) > 1:
+            lines.append(" | ".join(column["name"] for column in page["columns"]))
+        for row in rows[:RESULT_PREVIEW_ROWS]:
+            lines.append(" | ".join("" if cell is None else self._clip(str(cell), PREVIEW_CELL_LENGTH) for cell in row))
+
+        remaining = page["total_rows"] - min(len(rows), RESULT_PREVIEW_ROWS)
+        if remaining > 0:
+            lines.append(f"... {remaining} more {'lines' if page['kind'] == 'text' else 'rows'}")
+        return "\n".join(lines)
+
+    def cleanup_expired_results(self) -> int:
+        """Drop stored results older than the expiry time"""
+        current_time = datetime.now()
+        with self.lock:
+            expired = [
+                result_id for result_id, table in self.results.items()
+                if (current_time - table["created"]) > RESULT_EXPIRY
+            ]
+            for result_id in expired:
+                del self.results[result_id]
+        return len(expired)
+
+    def _store(self, table: dict) -> str:
+        """Keep a table for paging and return its ID"""
+        self.cleanup_expired_results()
+        result_id = uuid.uuid4().hex
+        with self.lock:
+            self.results[result_id] = {**table, "created": datetime.now()}
+            while len(self.results) > MAX_STORED_RESULTS:
+                self.results.popitem(last=False)
+        return result_id
+
+    def _get(self, result_id: str) -> Optional[dict]:
+        """Get a stored table if it has not expired"""
+        self.cleanup_expired_results()
+        with self.lock:
+            table = self.results.get(result_id)
+            if table is not None:
+                self.results.move_to_end(result_id)
+        return table
+
+    def _page(self, table: dict, result_id: Optional[str], offset: int, limit: int) -> dict:
+        """Slice a page out of a table"""
+        total_rows = len(table["rows"])
+        end = offset + limit
+        return {
+            "result_id": result_id,
+            "kind": table["kind"],
+            "columns": table["columns"],
+            "rows": table["rows"][offset:end],
+            "total_rows": total_rows,
+            "offset": offset,
+            "next_cursor": str(end) if end < total_rows else None,
+            "truncated": table["truncated"]
+        }
+
+    def _text_chunks(self, value: str) -> Iterator[str]:
+        """Split text into lines, and long lines into fixed-size chunks"""
+        for line in value.splitlines():
+            if not line:
+                yield line
+            for start in range(0, len(line), TEXT_CHUNK_LENGTH):
+                yield line[start:start + TEXT_CHUNK_LENGTH]
+
+    def _clip(self, value: Any, length: int) -> Any:
+        """Cut off a string longer than a length"""
+        if isinstance(value, str) and len(value) > length:
+            return value[:length] + "…"
+        return value
+
+    def _dict_records(self, value: dict) -> Iterator[dict]:
+        """Turn a mapping into records, one per key"""
+        for key, item in value.items():
+            if isinstance(item, dict):
+                # The outer key identifies the row, so it wins over an inner "key"
+                yield {"key": key, **{k: v for k, v in item.items() if k != "key"}}
+            else:
+                yield {"key": key, "value": item}
+
+    def _record(self, item: Any) -> dict:
+        """Turn a single result item into a record"""
+        if isinstance(item, dict):
+            return item
+        if self._is_entity(item):
+            return {
+                "global_id": getattr(item, "GlobalId", None),
+                "type": item.is_a(),
+                "name": getattr(item, "Name", None)
+            }
+        if isinstance(item, (list, tuple)):
+            return {f"column_{i + 1}": cell for i, cell in enumerate(item)}
+        return {"value": item}
+
+    def _cell(self, value: Any) -> Any:
+        """Make a value JSON-safe"""
+        if value is None or isinstance(value, (bool, int, str)):
+            return value
+        if isinstance(value, float):
+            return value if math.isfinite(value) else None
+        if self._is_entity(value):
+            return getattr(value, "GlobalId", None) or str(value)
+        if isinstance(value, dict):
+            return {str(k): self._cell(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple, set)):
+            return [self._cell(v) for v in value]
+        return str(value)
+
+    def _column_type(self, values: Iterator[Any]) -> str:
+        """Infer the schema type of a column from its values"""
+        types = {type(v) for v in values if v is not None}
+        if not types:
+            return "null"
+        if types == {bool}:
+            return "boolean"
+        if types == {int}:
+            return "integer"
+        if types <= {int, float}:
+            return "number"
+        if types == {str}:
+            return "string"
+        if types <= {list, dict}:
+            return "json"
+        return "string"
+
+    def _is_entity(self, value: Any) -> bool:
+        """Check for an ifcopenshell entity without importing ifcopenshell"""
+        return hasattr(value, "is_a") and hasattr(value, "id") and callable(value.is_a)
+
+# Create a singleton instance
+result_service = ResultService()
@@ -0,0 +1,205 @@
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from models.file_model import file_storage
+from services.ifc_service import ifc_service
+
+# Attributes that change on every export without the element itself changing
+IGNORED_ATTRIBUTES = {"OwnerHistory"}
+
+class RevisionService:
+    """Service for entity-level diffing between revisions of an IFC file"""
+
+    def __init__(self):
+        self.fingerprints: Dict[str, Dict[str, dict]] = {}  # file_path -> GlobalId -> element summary
+        self.diffs: Dict[Tuple[str, str], dict] = {}  # (old_path, new_path) -> diff
+        self.lock = threading.Lock()  # Guards the caches, diffs are computed in worker threads
+        self.computing: Dict[str, threading.Lock] = {}  # Per-file locks so fingerprints are computed only once
+
+    def get_fingerprints(self, file_path: str) -> Dict[str, dict]:
+        """Get the per-element fingerprints of a file, computing them on first use"""
+        with self.lock:
+            file_lock = self.computing.setdefault(file_path, threading.Lock())
+
+        with file_lock:
+            with self.lock:
+                if file_path in self.fingerprints:
+                    return self.fingerprints[file_path]
+
+            ifc_file = ifc_service.load_file(file_path)
+            memo: Dict[int, str] = {}
+            fingerprints = {}
+            for element in ifc_file.by_type("IfcObjectDefinition"):
+                fingerprints[element.GlobalId] = {
+                    "global_id": element.GlobalId,
+                    "type": element.is_a(),
+                    "name": getattr(element, "Name", None),
+                    "digest": self._element_digest(element, memo)
+                }
+
+            with self.lock:
+                self.fingerprints[file_path] = fingerprints
+            return fingerprints
+
+    def compute_diff(self, old_path: str, new_path: str) -> dict:
+        """
+        Compute the entity-level diff between two files, keyed on GlobalId
+
+        Args:
+            old_path: Path of the earlier revision
+            new_path: Path of the later revision
+
+        Returns:
+            Dictionary with added, removed and modified element summaries and
+            the GlobalIds of unchanged elements
+        """
+        key = (old_path, new_path)
+        with self.lock:
+            if key in self.diffs:
+                return self.diffs[key]
+
+        old = self.get_fingerprints(old_path)
+        new = self.get_fingerprints(new_path)
+
+        added, removed, modified, unchanged = [], [], [], []
+        for global_id, element in new.items():
+            if global_id not in old:
+                added.append(self._summary(element))
+            elif old[global_id]["digest"] != element["digest"]:
+                modified.append(self._summary(element))
+            else:
+                unchanged.append(global_id)
+        for global_id, element in old.items():
+            if global_id not in new:
+                removed.append(self._summary(element))
+
+        diff = {
+            "added": added,
+            "removed": removed,
+            "modified": modified,
+            "unchanged": unchanged
+        }
+        # A concurrent duplicate computation is harmless, keep the first
+        with self.lock:
+            return self.diffs.setdefault(key, diff)
+
+    def summarize(self, diff: dict) -> dict:
+        """Get change counts for a diff"""
+        return {
+            "added": len(diff["added"]),
+            "removed": len(diff["removed"]),
+            "modified": len(diff["modified"]),
+            "unchanged": len(diff["unchanged"])
+        }
+
+    def get_changes(self, filename: str, from_revision: Optional[int] = None,
+                    to_revision: Optional[int] = None, ifc_type: Optional[str] = None) -> Optional[dict]:
+        """
+        Describe what changed between two revisions of a file
+
+        Args:
+            filename: The tracked filename
+            from_revision: The earlier revision, defaults to the one before to_revision
+            to_revision: The later revision, defaults to the current revision
+            ifc_type: Only report elements of this IFC class
+
+        Returns:
+            The changes between the revisions, or None if either revision does not exist
+        """
+        current = file_storage.get_file(filename)
+        if current is None:
+            return None
+
+        to_revision = to_revision or current["revision"]
+        from_revision = from_revision or to_revision - 1
+        old = file_storage.get_revision(filename, from_revision)
+        new = file_storage.get_revision(filename, to_revision)
+        if old is None or new is None:
+            return None
+
+        diff = self.compute_diff(old["file_path"], new["file_path"])
+
+        def matches(element: dict) -> bool:
+            return ifc_type is None or element["type"].lower() == ifc_type.lower()
+
+        return {
+            "filename": filename,
+            "from_revision": from_revision,
+            "to_revision": to_revision,
+            "summary": self.summarize(diff),
+            "added": [e for e in diff["added"] if matches(e)],
+            "removed": [e for e in diff["removed"] if matches(e)],
+            "modified": [e for e in diff["modified"] if matches(e)]
+        }
+
+    def forget(self, file_path: str):
+        """Drop fingerprints and diffs involving a file"""
+        with self.lock:
+            self.fingerprints.pop(file_path, None)
+            self.computing.pop(file_path, None)
+            for key in [k for k in self.diffs if file_path in k]:
+                del self.diffs[key]
+
+    def _summary(self, element: dict) -> dict:
+        """Strip the digest from an element fingerprint"""
+        return {"global_id": element["global_id"], "type": element["type"], "name": element["name"]}
+
+    def _element_digest(self, element: Any, memo: Dict[int, str]) -> str:
+        """Digest an element together with its property sets, type and placement in the structure"""
+        parts = [self._entity_digest(element, memo)]
+        related: List[str] = []
+
+        for rel in getattr(element, "IsDefinedBy", None) or ():
+            if rel.is_a("IfcRelDefinesByProperties"):
+                definitions = rel.RelatingPropertyDefinition
+                if not isinstance(definitions, tuple):
+                    definitions = (definitions,)
+                related.extend(self._entity_digest(d, memo) for d in definitions)
+            elif rel.is_a("IfcRelDefinesByType") and rel.RelatingType:
+                related.append(self._element_digest(rel.RelatingType, memo))
+        for rel in getattr(element, "IsTypedBy", None) or ():
+            related.append(self._element_digest(rel.RelatingType, memo))
+        for pset in getattr(element, "HasPropertySets", None) or ():
+            related.append(self._entity_digest(pset, memo))
+        for rel in getattr(element, "ContainedInStructure", None) or ():
+            related.append(f"in:{rel.RelatingStructure.GlobalId}")
+        for rel in getattr(element, "Decomposes", None) or ():
+            related.append(f"part-of:{rel.RelatingObject.GlobalId}")
+
+        parts.extend(sorted(related))
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+    def _entity_digest(self, entity: Any, memo: Dict[int, str]) -> str:
+        """Digest an entity's attributes, independent of its STEP id"""
+        entity_id = entity.id()
+        if entity_id and entity_id in memo:
+            return memo[entity_id]
+
+        parts = [entity.is_a()]
+        for index in range(len(entity)):
+            if entity.attribute_name(index) in IGNORED_ATTRIBUTES:
+                continue
+            parts.append(self._value_token(entity[index], memo))
+
+        digest = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+        if entity_id:
+            memo[entity_id] = digest
+        return digest
+
+    def _value_token(self, value: Any, memo: Dict[int, str]) -> str:
+        """Serialize an attribute value for digesting"""
+        if callable(getattr(value, "is_a", None)):
+            if not value.id():
+                # Typed value such as IfcLabel or IfcLengthMeasure
+                return f"{value.is_a()}({value.wrappedValue!r})"
+            if value.is_a("IfcRoot"):
+                # Other rooted entities are diffed on their own
+                return f"@{value.GlobalId}"
+            return self._entity_digest(value, memo)
+        if isinstance(value, (tuple, list)):
+            return "(" + ",".join(self._value_token(v, memo) for v in value) + ")"
+        return repr(value)
+
+# Create a singleton instance
+revision_service = RevisionService()
+file_storage.register_delete_hook(revision_service.forget)
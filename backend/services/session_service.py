@@ -0,0 +1,188 @@
+import sys
+import threading
+import types
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from config import MAX_SESSIONS, SESSION_IDLE_TIMEOUT, SESSION_MEMORY_LIMIT, SESSION_PROMPT_TURNS
+from services.relationship_service import HELPER_NAMES
+
+# Names provided by execute_code that are never carried between turns
+RESERVED_NAMES = {"__builtins__", "ifc_file", "ifcopenshell", "result", "ifc_index", "get_psets", *HELPER_NAMES}
+SIZE_WALK_LIMIT = 100000  # Most objects visited when estimating the size of a variable
+
+class Session:
+    """A conversation about one IFC file with the variables of earlier turns"""
+
+    def __init__(self, session_id: str, file_path: str):
+        self.session_id = session_id
+        self.file_path = file_path
+        self.ifc_file: Any = None  # The parsed model the kept variables refer to
+        self.namespace: Dict[str, Any] = {}
+        self.turns: List[dict] = []
+        self.last_access = datetime.now()
+        self.lock = threading.Lock()  # Guards namespace and turns against concurrent turns
+
+    def copy_namespace(self) -> Dict[str, Any]:
+        """
+        Get a copy of the namespace for a turn to run in
+
+        Lists, dicts, sets and tuples are copied all the way down, so a failed
+        turn cannot change the kept values. Entities and other objects are shared.
+        """
+        with self.lock:
+            memo: Dict[int, Any] = {}
+            return {name: _copy_containers(value, memo) for name, value in self.namespace.items()}
+
+    def context(self) -> Tuple[List[dict], Dict[str, str]]:
+        """Get the recent turns and the names and types of the kept variables"""
+        with self.lock:
+            return list(self.turns), {name: type(value).__name__ for name, value in self.namespace.items()}
+
+def _copy_containers(value: Any, memo: Dict[int, Any]) -> Any:
+    """Copy nested built-in containers, keeping shared and cyclic references intact"""
+    if id(value) in memo:
+        return memo[id(value)]
+    if isinstance(value, list):
+        copy = memo[id(value)] = []
+        copy.extend(_copy_containers(item, memo) for item in value)
+    elif isinstance(value, dict):
+        copy = memo[id(value)] = {}
+        for key, item in value.items():
+            copy[key] = _copy_containers(item, memo)
+    elif isinstance(value, set):
+        copy = memo[id(value)] = {_copy_containers(item, memo) for item in value}
+    elif isinstance(value, tuple):
+        copy = memo[id(value)] = tuple(_copy_containers(item, memo) for item in value)
+    else:
+        return value
+    return copy
+
+class SessionService:
+    """Service for session-scoped conversations with a persistent execution namespace"""
+
+    def __init__(self):
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()  # Least recently used first
+        self.lock = threading.Lock()  # Guards the store, turns are recorded from worker threads
+
+    def get_session(self, session_id: Optional[str], file_path: str) -> Session:
+        """
+        Get an existing session or start a new one
+
+        Args:
+            session_id: The session ID sent by the client, if any
+            file_path: The IFC file the query is about
+
+        Returns:
+            The session to run the query in
+        """
+        self.cleanup_idle_sessions()
+
+        with self.lock:
+            session = self.sessions.get(session_id) if session_id else None
+            if session is None:
+                session = Session(session_id or uuid.uuid4().hex, file_path)
+                self.sessions[session.session_id] = session
+                while len(self.sessions) > MAX_SESSIONS:
+                    self.sessions.popitem(last=False)
+            elif session.file_path != file_path:
+                # Variables refer to entities of the previous model, start over
+                with session.lock:
+                    session.file_path = file_path
+                    session.ifc_file = None
+                    session.namespace = {}
+                    session.turns = []
+
+            self.sessions.move_to_end(session.session_id)
+            session.last_access = datetime.now()
+        return session
+
+    def bind_model(self, session: Session, ifc_file: Any):
+        """
+        Tie a session to the parsed model a turn runs against
+
+        If the model was evicted and parsed again since the last turn, the
+        kept variables hold entities of the old model. They are dropped, so
+        they are never compared with entities of the new one and do not keep
+        the old model in memory.
+        """
+        with session.lock:
+            if session.ifc_file is not ifc_file:
+                if session.ifc_file is not None:
+                    session.namespace = {}
+                session.ifc_file = ifc_file
+
+    def record_turn(self, session: Session, query: str, code: str, result: str,
+                    namespace: Dict[str, Any], ifc_file: Any = None):
+        """Keep the variables and outcome of a successful turn run against ifc_file"""
+        with session.lock:
+            # Variables of a turn that ran against a since-replaced model are not kept
+            kept = namespace if ifc_file is None or session.ifc_file is ifc_file else {}
+            for name, value in kept.items():
+                if name in RESERVED_NAMES or name.startswith("__") or isinstance(value, types.ModuleType):
+                    continue
+                # Re-insert so the namespace stays ordered by last assignment
+                session.namespace.pop(name, None)
+                session.namespace[name] = value
+
+            session.turns.append({"query": query, "code": code, "result": result})
+            del session.turns[:-SESSION_PROMPT_TURNS]
+            self._enforce_memory_limit(session)
+
+    def delete_session(self, session_id: str) -> bool:
+        """Delete a session"""
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def cleanup_idle_sessions(self) -> int:
+        """Drop sessions that have been idle longer than the timeout"""
+        current_time = datetime.now()
+        with self.lock:
+            idle = [
+                session_id for session_id, session in self.sessions.items()
+                if (current_time - session.last_access) > SESSION_IDLE_TIMEOUT
+            ]
+            for session_id in idle:
+                del self.sessions[session_id]
+        return len(idle)
+
+    def _enforce_memory_limit(self, session: Session):
+        """Evict the least recently assigned variables until the session fits its memory cap"""
+        # Called from record_turn with session.lock held
+        sizes = {name: self._estimate_size(value) for name, value in session.namespace.items()}
+        total = sum(sizes.values())
+        for name in list(session.namespace):
+            if total <= SESSION_MEMORY_LIMIT:
+                break
+            total -= sizes[name]
+            del session.namespace[name]
+
+    def _estimate_size(self, value: Any) -> int:
+        """
+        Approximate the memory held by a value, walking nested containers
+
+        The walk stops after SIZE_WALK_LIMIT objects; objects left unvisited
+        are counted at the average size of the visited ones. Entities count
+        only their own instance, their model is shared with the model cache.
+        """
+        size = 0
+        seen = set()
+        pending = [value]
+        while pending and len(seen) < SIZE_WALK_LIMIT:
+            item = pending.pop()
+            if id(item) in seen:
+                continue
+            seen.add(id(item))
+            size += sys.getsizeof(item)
+            if isinstance(item, dict):
+                pending.extend(item.keys())
+                pending.extend(item.values())
+            elif isinstance(item, (list, tuple, set, frozenset)):
+                pending.extend(item)
+        if pending:
+            size += len(pending) * size // len(seen)
+        return size
+
+# Create a singleton instance
+session_service = SessionService()
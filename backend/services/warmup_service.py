@@ -0,0 +1,83 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Dict, List
+from fastapi.concurrency import run_in_threadpool
+from config import UPLOAD_DIR, FILE_EXPIRY, WARMUP_MAX_FILES, WARMUP_RETRY_DELAY, WARMUP_MAX_RETRY_DELAY
+from services.ai_service import ai_service
+from services.relationship_service import relationship_service
+
+class WarmupService:
+    """Service for startup warm-up and the readiness it reports"""
+
+    def __init__(self):
+        self.started = False
+        self.finished = False  # Recent uploads have been preloaded
+        self.model_attempts = 0
+        self.preloaded: List[str] = []
+        self.timings: Dict[str, float] = {}  # Seconds spent in each warm-up phase
+
+    @property
+    def ready(self) -> bool:
+        """Whether the LLM client is initialized and recent uploads have been preloaded"""
+        return self.finished and ai_service.initialized
+
+    async def warm_up(self):
+        """Initialize the LLM client while preloading recent uploads"""
+        self.started = True
+        started = time.monotonic()
+        await asyncio.gather(self._initialize_model(), self._preload_recent_files())
+        self.timings["total"] = round(time.monotonic() - started, 3)
+        print(f"Warm-up finished: {self.timings}")
+
+    def status(self) -> dict:
+        """Get warm-up progress for the readiness endpoint"""
+        return {
+            "ready": self.ready,
+            "model_initialized": ai_service.initialized,
+            "model_attempts": self.model_attempts,
+            "preload_finished": self.finished,
+            "preloaded_files": len(self.preloaded),
+            "timings": self.timings
+        }
+
+    async def _initialize_model(self):
+        """Create the Gemini client, including its slow first import, retrying with backoff until it succeeds"""
+        started = time.monotonic()
+        delay = WARMUP_RETRY_DELAY
+        # A query may initialize the client lazily in the meantime
+        while not ai_service.initialized:
+            self.model_attempts += 1
+            try:
+                await run_in_threadpool(ai_service.initialize)
+            except Exception as e:
+                print(f"Warm-up could not initialize the AI model (attempt {self.model_attempts}), retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, WARMUP_MAX_RETRY_DELAY)
+        self.timings["model"] = round(time.monotonic() - started, 3)
+
+    async def _preload_recent_files(self):
+        """Parse and index the most recently uploaded files that have not expired"""
+        started = time.monotonic()
+        for file_path in self._recent_files():
+            try:
+                await run_in_threadpool(relationship_service.get_index, file_path)
+                self.preloaded.append(file_path)
+            except Exception as e:
+                print(f"Warm-up could not preload {file_path}: {e}")
+        self.timings["preload"] = round(time.monotonic() - started, 3)
+        self.finished = True
+
+    def _recent_files(self) -> List[str]:
+        """List uploads modified within the expiry time, newest first"""
+        cutoff = datetime.now().timestamp() - FILE_EXPIRY.total_seconds()
+        paths = [
+            entry.path for entry in os.scandir(UPLOAD_DIR)
+            if entry.is_file() and entry.name.endswith(".ifc") and entry.stat().st_mtime > cutoff
+        ]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        return paths[:WARMUP_MAX_FILES]
+
+# Create a singleton instance
+warmup_service = WarmupService()
@@ -4,10 +4,12 @@ from typing import Any, Dict, Optional
 
 class AppException(Exception):
     """Base exception class for the application"""
-    def __init__(self, message: str, status_code: int = 500, detail: Optional[Dict[str, Any]] = None):
+    def __init__(self, message: str, status_code: int = 500, detail: Optional[Dict[str, Any]] = None,
+                 headers: Optional[Dict[str, str]] = None):
         self.message = message
         self.status_code = status_code
         self.detail = detail or {}
+        self.headers = headers
         super().__init__(self.message)
 
 class FileUploadError(AppException):
@@ -30,11 +32,17 @@ class CodeExecutionError(AppException):
     def __init__(self, message: str, detail: Optional[Dict[str, Any]] = None):
         super().__init__(message, status_code=500, detail=detail)
 
+class QueueFullError(AppException):
+    """Exception for queries rejected because the server is overloaded"""
+    def __init__(self, message: str, retry_after: int, detail: Optional[Dict[str, Any]] = None):
+        super().__init__(message, status_code=429, detail=detail, headers={"Retry-After": str(retry_after)})
+
 def handle_app_exception(request: Any, exc: AppException) -> JSONResponse:
     """Handle application exceptions"""
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.message, "additional_info": exc.detail}
+        content={"detail": exc.message, "additional_info": exc.detail},
+        headers=exc.headers
     )
 
 def handle_http_exception(request: Any, exc: HTTPException) -> JSONResponse:
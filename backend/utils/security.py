@@ -1,6 +1,6 @@
 import re
 import traceback
-from typing import Dict, Any
+from typing import Any, Dict, Optional
 
 def clean_code(code_text: str) -> str:
     """Clean the code by removing markdown code block delimiters and other formatting"""
@@ -24,25 +24,44 @@ def clean_code(code_text: str) -> str:
     
     return code_text
 
-def execute_code(code: str, ifc_file: Any) -> str:
-    """Execute the generated code in a safe environment"""
+def run_code(code: str, ifc_file: Any, namespace: Dict[str, Any],
+             helpers: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Execute the generated code in the given namespace
+    
+    Variables the code defines, including 'result', are left in the
+    namespace for the caller. Helpers are extra read-only names made
+    available to the code.
+    
+    Returns:
+        None on success, otherwise the traceback of the failure
+    """
     try:
-        # Create isolated namespace with allowed variables
-        exec_namespace = {
+        # Populate the isolated namespace with allowed variables
+        namespace.update(helpers or {})
+        namespace.update({
             'ifc_file': ifc_file,
             'ifcopenshell': __import__('ifcopenshell'),
             'result': None
-        }
+        })
         
         # Execute the code
-        exec(code, exec_namespace)
-        return str(exec_namespace.get('result', 'No result returned'))
+        exec(code, namespace)
+        return None
         
     except Exception as e:
         error_trace = traceback.format_exc()
         print(f"Execution failed with error:\n{error_trace}")
         return error_trace
 
+def execute_code(code: str, ifc_file: Any) -> str:
+    """Execute the generated code in a safe environment"""
+    exec_namespace = {}
+    error_trace = run_code(code, ifc_file, exec_namespace)
+    if error_trace:
+        return error_trace
+    return str(exec_namespace.get('result', 'No result returned'))
+
 def is_safe_filename(filename: str) -> bool:
     """Check if a filename is safe to use"""
     # Check for path traversal attempts
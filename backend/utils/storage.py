@@ -21,7 +21,7 @@ def save_uploaded_file(file_content: bytes, original_filename: str) -> Tuple[str
         raise ValueError(f"File size exceeds maximum allowed size of {MAX_FILE_SIZE // (1024 * 1024)}MB")
     
     # Create a unique filename to avoid conflicts
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     safe_filename = f"{timestamp}_{original_filename}"
     file_path = os.path.join(UPLOAD_DIR, safe_filename)
     
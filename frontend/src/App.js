@@ -6,6 +6,95 @@ import "./index.css";
 
 const API_BASE_URL = "http://localhost:8000";
 
+// Renders a structured query result page by page, with CSV export
+function ResultTable({ result }) {
+  const [rows, setRows] = useState(result.rows);
+  const [nextCursor, setNextCursor] = useState(result.next_cursor);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  const [loadError, setLoadError] = useState(null);
+
+  const loadMore = async () => {
+    setIsLoadingMore(true);
+    setLoadError(null);
+    try {
+      const response = await fetch(
+        `${API_BASE_URL}/query/results/${result.result_id}?cursor=${nextCursor}`
+      );
+      if (!response.ok) {
+        const errorData = await response.json();
+        throw new Error(errorData.detail || "Failed to load more rows");
+      }
+      const page = await response.json();
+      setRows((prev) => [...prev, ...page.rows]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      setLoadError(error.message);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
+  return (
+    <div className="result-table">
+      {result.kind === "text" ? (
+        <pre className="result-text">{rows.map((row) => row[0]).join("\n")}</pre>
+      ) : (
+        <div className="result-scroll">
+          <table>
+            <thead>
+              <tr>
+                {result.columns.map((column) => (
+                  <th key={column.name}>{column.name}</th>
+                ))}
+              </tr>
+            </thead>
+            <tbody>
+              {rows.map((row, rowIndex) => (
+                <tr key={rowIndex}>
+                  {row.map((cell, cellIndex) => (
+                    <td key={cellIndex}>
+                      {cell === null
+                        ? ""
+                        : typeof cell === "object"
+                        ? JSON.stringify(cell)
+                        : String(cell)}
+                    </td>
+                  ))}
+                </tr>
+              ))}
+            </tbody>
+          </table>
+        </div>
+      )}
+      <div className="result-footer">
+        <span>
+          Showing {rows.length} of {result.total_rows}
+          {result.truncated ? " (truncated)" : ""}
+        </span>
+        {nextCursor && (
+          <button
+            type="button"
+            className="result-button"
+            onClick={loadMore}
+            disabled={isLoadingMore}
+          >
+            {isLoadingMore ? "Loading..." : "Load more"}
+          </button>
+        )}
+        {result.result_id && (
+          <a
+            className="result-button"
+            href={`${API_BASE_URL}/query/results/${result.result_id}/export?format=csv`}
+          >
+            Export CSV
+          </a>
+        )}
+      </div>
+      {loadError && <div className="error-message">{loadError}</div>}
+    </div>
+  );
+}
+
 function App() {
   const [messages, setMessages] = useState([]);
   const [inputMessage, setInputMessage] = useState("");
@@ -15,6 +104,7 @@ function App() {
   const [isUploading, setIsUploading] = useState(false);
   const [error, setError] = useState(null);
   const [apiStatus, setApiStatus] = useState("checking");
+  const [sessionId, setSessionId] = useState(null);
   const chatContainerRef = useRef(null);
 
   // Check API status on component mount
@@ -73,6 +163,7 @@ function App() {
         body: JSON.stringify({
           message: inputMessage,
           file_path: file.path,
+          session_id: sessionId,
         }),
       });
 
@@ -82,8 +173,10 @@ function App() {
       }
 
       const data = await response.json();
+      setSessionId(data.session_id);
       const botResponse = {
         text: data.response,
+        result: data.result,
         sender: "bot",
         timestamp: new Date().toISOString(),
       };
@@ -131,6 +224,7 @@ function App() {
           name: data.filename,
           path: data.file_path,
         });
+        setSessionId(null);
         setUploadSuccess(true);
         setTimeout(() => setUploadSuccess(false), 3000);
 
@@ -250,7 +344,11 @@ function App() {
                   message.sender === "user" ? "user-message" : "bot-message"
                 }
               >
-                {message.text}
+                {message.result && message.result.kind !== "scalar" ? (
+                  <ResultTable result={message.result} />
+                ) : (
+                  message.text
+                )}
               </div>
             </div>
           </div>